@@ -1,4 +1,6 @@
 import sqlite3
+import threading
+from pathlib import Path
 from typing import Union, List, Dict
 from dataclasses import dataclass
 import argparse
@@ -28,82 +30,312 @@ class PlayerStats:
     showdown_details: List[tuple] = None
     rfi_details: List[tuple] = None
 
+# Each {players} slot is filled with the player-name predicate: '= ?' for a
+# single player, 'IN (?, ...)' otherwise.
+_STATS_QUERY = """
+    WITH RequestedPlayers AS (
+        -- Resolve the requested names once; everything below joins on player_id
+        SELECT player_id, name
+        FROM players
+        WHERE name {players}
+    ),
+    PlayerHands AS MATERIALIZED (
+        -- Get all hands where player was dealt cards (unique: hand_players
+        -- is keyed on hand_id, player_id)
+        SELECT 
+            p.name,
+            hp.hand_id,
+            hp.cards_shown,
+            hp.net_result,
+            -- Reached the river: acted on it or showed down
+            hp.cards_shown IS NOT NULL OR EXISTS (
+                SELECT 1
+                FROM actions a
+                WHERE a.hand_id = hp.hand_id
+                    AND a.player_id = hp.player_id
+                    AND a.street = 'river'
+            ) as reached_river
+        FROM RequestedPlayers p
+        JOIN hand_players hp ON p.player_id = hp.player_id
+        JOIN hands h ON hp.hand_id = h.hand_id
+    ),
+    PreflopActions AS MATERIALIZED (
+        -- Every preflop action taken by the requested players
+        SELECT
+            p.name,
+            hp.hand_id,
+            hp.player_id,
+            hp.position,
+            a.sequence_number,
+            a.action_type,
+            a.amount
+        FROM RequestedPlayers p
+        JOIN hand_players hp ON p.player_id = hp.player_id
+        JOIN actions a ON hp.hand_id = a.hand_id
+            AND hp.player_id = a.player_id
+        WHERE a.street = 'preflop'
+            -- Redundant with the join, but lets the planner drive the lookup
+            -- from hand_players' player index: it cannot see how few rows
+            -- RequestedPlayers holds and would otherwise scan every preflop action
+            AND hp.player_id IN (SELECT player_id FROM RequestedPlayers)
+    ),
+    HandSequences AS MATERIALIZED (
+        -- Per-hand landmarks shared by the RFI, steal, 3bet and ISO checks
+        SELECT
+            hand_id,
+            total_players,
+            first_raise_or_call_seq,
+            first_raise_seq,
+            CASE 
+                WHEN sb_position - 3 < 1 THEN total_players - (3 - sb_position)
+                ELSE sb_position - 3
+            END as hj_position,
+            CASE 
+                WHEN sb_position - 2 < 1 THEN total_players - (2 - sb_position)
+                ELSE sb_position - 2
+            END as co_position,
+            CASE 
+                WHEN sb_position - 1 < 1 THEN total_players
+                ELSE sb_position - 1
+            END as btn_position
+        FROM (
+            SELECT
+                a.hand_id,
+                h.total_players,
+                MIN(a.sequence_number) FILTER (WHERE a.action_type IN ('raise', 'call')) as first_raise_or_call_seq,
+                MIN(a.sequence_number) FILTER (WHERE a.action_type = 'raise') as first_raise_seq,
+                -- The small blind is whoever posted the first blind of the hand
+                MAX(hp.position) FILTER (WHERE a.action_type = 'blind' AND a.sequence_number = 1) as sb_position
+            FROM actions a
+            JOIN hands h ON a.hand_id = h.hand_id
+            LEFT JOIN hand_players hp ON a.hand_id = hp.hand_id
+                AND a.player_id = hp.player_id
+            WHERE a.street = 'preflop'
+                AND a.hand_id IN (SELECT hand_id FROM PreflopActions)
+            GROUP BY a.hand_id
+        )
+    ),
+    PlayerPreflop AS MATERIALIZED (
+        -- One row per player and hand summarising their preflop decisions
+        SELECT
+            pa.name,
+            pa.hand_id,
+            hs.first_raise_or_call_seq,
+            pa.position IN (hs.hj_position, hs.co_position, hs.btn_position) as is_late_position,
+            MIN(pa.sequence_number) as first_action_seq,
+            MAX(pa.sequence_number) as last_action_seq,
+            MIN(pa.sequence_number) FILTER (WHERE pa.action_type = 'raise') as first_own_raise_seq,
+            MAX(pa.sequence_number) FILTER (WHERE pa.action_type = 'raise') as last_own_raise_seq,
+            MAX(
+                pa.action_type IN ('raise', 'call')
+                OR (pa.action_type = 'bet' AND pa.amount > 0)
+            ) as put_money_in,
+            MAX(pa.action_type = 'blind') as posted_blind,
+            MAX(pa.action_type = 'check') as checked,
+            (
+                -- First raise by anyone else
+                SELECT MIN(a2.sequence_number)
+                FROM actions a2
+                WHERE a2.hand_id = pa.hand_id
+                    AND a2.player_id != pa.player_id
+                    AND a2.street = 'preflop'
+                    AND a2.action_type = 'raise'
+            ) as first_other_raise_seq,
+            (
+                -- First limp (call before any raise) by anyone else
+                SELECT MIN(a2.sequence_number)
+                FROM actions a2
+                WHERE a2.hand_id = pa.hand_id
+                    AND a2.player_id != pa.player_id
+                    AND a2.street = 'preflop'
+                    AND a2.action_type = 'call'
+                    AND (hs.first_raise_seq IS NULL OR a2.sequence_number < hs.first_raise_seq)
+            ) as first_other_limp_seq
+        FROM PreflopActions pa
+        JOIN HandSequences hs ON pa.hand_id = hs.hand_id
+        GROUP BY pa.name, pa.hand_id
+    ),
+    PlayerCounts AS (
+        -- One grouped pass over the player's hands; each stat counts the
+        -- hands matching its condition
+        SELECT 
+            ph.name,
+            COUNT(*) as total_hands,
+            -- Voluntarily put money in (a blind that later checked counts as well)
+            COUNT(*) FILTER (
+                WHERE pp.put_money_in OR (pp.posted_blind AND pp.checked)
+            ) as vpip_hands,
+            -- There was a raise before the player acted / the player re-raised it
+            COUNT(*) FILTER (WHERE pp.last_action_seq > pp.first_other_raise_seq) as threeb_opportunities,
+            COUNT(*) FILTER (WHERE pp.last_own_raise_seq > pp.first_other_raise_seq) as threeb_count,
+            COUNT(*) FILTER (WHERE ph.reached_river) as river_hands,
+            COUNT(*) FILTER (WHERE ph.cards_shown IS NOT NULL) as showdown_hands,
+            COUNT(*) FILTER (WHERE ph.cards_shown IS NOT NULL AND ph.net_result > 0) as won_hands,
+            -- Folded to the player / the player raised first in
+            COUNT(*) FILTER (
+                WHERE pp.hand_id IS NOT NULL
+                    AND (pp.first_raise_or_call_seq IS NULL OR pp.first_action_seq <= pp.first_raise_or_call_seq)
+            ) as rfi_opportunities,
+            COUNT(*) FILTER (WHERE pp.first_own_raise_seq = pp.first_raise_or_call_seq) as rfi_count,
+            -- The same, from HJ, CO or BTN (using relative positions)
+            COUNT(*) FILTER (
+                WHERE pp.is_late_position
+                    AND (pp.first_raise_or_call_seq IS NULL OR pp.first_action_seq <= pp.first_raise_or_call_seq)
+            ) as steal_opportunities,
+            COUNT(*) FILTER (
+                WHERE pp.is_late_position
+                    AND pp.first_own_raise_seq = pp.first_raise_or_call_seq
+            ) as steal_attempts,
+            -- There was a limp before the player acted / the player raised over it
+            COUNT(*) FILTER (WHERE pp.last_action_seq > pp.first_other_limp_seq) as iso_opportunities,
+            COUNT(*) FILTER (WHERE pp.last_own_raise_seq > pp.first_other_limp_seq) as iso_attempts
+        FROM PlayerHands ph
+        LEFT JOIN PlayerPreflop pp ON ph.name = pp.name AND ph.hand_id = pp.hand_id
+        GROUP BY ph.name
+    )
+    SELECT 
+        *,
+        CASE WHEN total_hands > 0 THEN CAST(vpip_hands AS REAL) / total_hands * 100 ELSE 0 END as vpip_percentage,
+        -- Also reported as WTSD (went to showdown)
+        CASE WHEN vpip_hands > 0 THEN CAST(showdown_hands AS REAL) / vpip_hands * 100 ELSE 0 END as showdown_percentage,
+        CASE WHEN showdown_hands > 0 THEN CAST(won_hands AS REAL) / showdown_hands * 100 ELSE 0 END as w_sd_percentage,
+        CASE WHEN total_hands > 0 THEN CAST(rfi_count AS REAL) / total_hands * 100 ELSE 0 END as rfi_percentage,
+        CASE WHEN iso_opportunities > 0 THEN CAST(iso_attempts AS REAL) / iso_opportunities * 100 ELSE 0 END as iso_percentage
+    FROM PlayerCounts"""
+
+_SHOWDOWN_DETAILS_QUERY = """
+    SELECT 
+        p.name,
+        hp.hand_id,
+        hp.cards_shown,
+        COALESCE(h.board_cards, ''),
+        CAST(hp.net_result AS REAL)
+    FROM players p
+    JOIN hand_players hp ON p.player_id = hp.player_id
+    JOIN hands h ON hp.hand_id = h.hand_id
+    WHERE p.name {players}
+        AND hp.cards_shown IS NOT NULL"""
+
+_RFI_DETAILS_QUERY = """
+    SELECT 
+        name,
+        hand_id,
+        -- Relative position name, e.g. BTN/SB/BB, UTG..CO at 6-max and 9-max
+        CASE 
+            WHEN NOT COALESCE(seat, 0) THEN 'Unknown'
+            WHEN seats_after_button IS NULL THEN 'Seat ' || seat
+            WHEN seats_after_button = 0 THEN 'BTN'
+            WHEN seats_after_button = 1 THEN 'SB'
+            WHEN seats_after_button = 2 THEN 'BB'
+            WHEN total_players >= 9 AND seats_after_button <= 8 THEN
+                CASE seats_after_button
+                    WHEN 3 THEN 'UTG' WHEN 4 THEN 'UTG+1' WHEN 5 THEN 'MP1'
+                    WHEN 6 THEN 'MP2' WHEN 7 THEN 'HJ' ELSE 'CO'
+                END
+            WHEN total_players BETWEEN 6 AND 8 AND seats_after_button <= 5 THEN
+                CASE seats_after_button WHEN 3 THEN 'UTG' WHEN 4 THEN 'MP' ELSE 'CO' END
+            ELSE '+' || seats_after_button
+        END as position,
+        cards,
+        amount,
+        result
+    FROM (
+        SELECT 
+            *,
+            CASE 
+                WHEN COALESCE(button_seat, 0) AND COALESCE(total_players, 0)
+                THEN ((seat - button_seat) % total_players + total_players) % total_players
+            END as seats_after_button
+        FROM (
+            SELECT 
+                p.name,
+                hp.hand_id,
+                hp.position as seat,
+                CASE 
+                    WHEN COALESCE(h.button_position, 0) THEN h.button_position
+                    -- Button not recorded: it is the seat before the small blind
+                    ELSE (
+                        SELECT CASE WHEN hp_sb.position > 1 THEN hp_sb.position - 1 ELSE h.total_players END
+                        FROM actions a_sb
+                        JOIN hand_players hp_sb ON a_sb.hand_id = hp_sb.hand_id
+                            AND a_sb.player_id = hp_sb.player_id
+                        WHERE a_sb.hand_id = hp.hand_id
+                            AND a_sb.action_type = 'blind'
+                        ORDER BY a_sb.amount ASC
+                        LIMIT 1
+                    )
+                END as button_seat,
+                h.total_players,
+                COALESCE(hp.cards_shown, '') as cards,
+                COALESCE(CAST(a.amount AS REAL), 0.0) as amount,
+                COALESCE(CAST(hp.net_result AS REAL), 0.0) as result
+            FROM players p
+            JOIN hand_players hp ON p.player_id = hp.player_id
+            JOIN hands h ON hp.hand_id = h.hand_id
+            JOIN actions a ON hp.hand_id = a.hand_id 
+                AND hp.player_id = a.player_id
+                AND a.street = 'preflop'
+                AND a.action_type = 'raise'
+            WHERE p.name {players}
+                -- Raised first in: this raise is the hand's first raise or call
+                AND a.sequence_number = (
+                    SELECT MIN(a2.sequence_number)
+                    FROM actions a2
+                    WHERE a2.hand_id = a.hand_id
+                        AND a2.street = 'preflop'
+                        AND a2.action_type IN ('raise', 'call')
+                )
+        )
+    )"""
+
 class PokerStatsCalculator:
     def __init__(self, db_path: str = "poker_analysis.db"):
-        """Initialize calculator with path to SQLite database."""
+        """Initialize calculator with path to SQLite database.
+
+        The connection is opened on first use and kept open across
+        calculate_stats() calls; use the calculator as a context manager
+        (or call close()) to release it. Calls from several threads take
+        turns on the connection.
+        """
         self.db_path = db_path
         self.conn = None
+        # Serializes use of the shared connection: each calculate_stats() runs
+        # its queries in one transaction, which cannot be interleaved
+        self._lock = threading.RLock()
+        # Formatted (stats, showdown details, RFI details) queries, keyed by number of players
+        self._stmt_cache: Dict[int, tuple] = {}
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def connect(self):
-        """Establish database connection."""
-        if not self.conn:
-            self.conn = sqlite3.connect(self.db_path)
+        """Establish a read-only database connection."""
+        with self._lock:
+            if not self.conn:
+                uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+                self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+                # journal_mode/synchronous are left alone: nothing is written
+                # through this connection. mmap_size is clamped by SQLite to its
+                # compile-time maximum.
+                self.conn.executescript("""
+                    PRAGMA query_only = ON;
+                    PRAGMA temp_store = MEMORY;
+                    PRAGMA mmap_size = 8589934592;
+                    PRAGMA cache_size = -524288;
+                    PRAGMA cache_spill = OFF;
+                    PRAGMA threads = 4;
+                """)
     
     def close(self):
         """Close database connection."""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-
-    def _calculate_button_from_actions(self, hand_id: str) -> tuple:
-        """Calculate button position and total players from blind actions for a specific hand."""
-        cursor = self.conn.cursor()
-        
-        # Find the small blind action (smallest blind amount)
-        blind_query = """
-        SELECT hp.position, a.amount, p.name
-        FROM actions a
-        JOIN hand_players hp ON a.hand_id = hp.hand_id AND a.player_id = hp.player_id
-        JOIN players p ON a.player_id = p.player_id
-        WHERE a.hand_id = ? AND a.action_type = 'blind'
-        ORDER BY a.amount ASC
-        LIMIT 1
-        """
-        
-        cursor.execute(blind_query, (hand_id,))
-        result = cursor.fetchone()
-        
-        if not result:
-            return None, None
-        
-        sb_seat, sb_amount, sb_player = result
-        
-        # Get total players to handle wraparound
-        cursor.execute("SELECT total_players FROM hands WHERE hand_id = ?", (hand_id,))
-        total_result = cursor.fetchone()
-        total_players = total_result[0] if total_result else None
-        
-        if not total_players:
-            return None, None
-        
-        # Button is one seat before small blind (with wraparound)
-        button_seat = sb_seat - 1 if sb_seat > 1 else total_players
-        
-        return button_seat, total_players
-
-    def get_position_name(self, seat: int, button_seat: int, total_players: int) -> str:
-        """Convert absolute seat to relative position name."""
-        # Calculate seats after button (with wraparound)
-        seats_after_button = (seat - button_seat) % total_players
-        
-        # Map to position names based on seats after button
-        if seats_after_button == 0:
-            return "BTN"
-        elif seats_after_button == 1:
-            return "SB"
-        elif seats_after_button == 2:
-            return "BB"
-        elif total_players >= 9:
-            # 9-max positions
-            position_map = {3: "UTG", 4: "UTG+1", 5: "MP1", 6: "MP2", 7: "HJ", 8: "CO"}
-            return position_map.get(seats_after_button, f"+{seats_after_button}")
-        elif total_players >= 6:
-            # 6-max positions
-            position_map = {3: "UTG", 4: "MP", 5: "CO"}
-            return position_map.get(seats_after_button, f"+{seats_after_button}")
-        else:
-            # Short-handed
-            return f"+{seats_after_button}"
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
 
     def calculate_stats(self, players: Union[str, List[str]]) -> Dict[str, PlayerStats]:
         """
@@ -112,445 +344,57 @@ class PokerStatsCalculator:
         if isinstance(players, str):
             players = [players]
             
-        self.connect()
+        with self._lock:
+            self.connect()
         
-        query = """
-        WITH PlayerHands AS (
-            -- Get all hands where player was dealt cards
-            SELECT 
-                p.name,
-                hp.hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN hands h ON hp.hand_id = h.hand_id
-            WHERE p.name IN ({})
-            GROUP BY p.name, hp.hand_id
-        ),
-        VPIPHands AS (
-            -- Get hands where player voluntarily put money in
-            SELECT DISTINCT
-                p.name,
-                hp.hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN actions a ON hp.hand_id = a.hand_id 
-                AND hp.player_id = a.player_id
-            WHERE p.name IN ({})
-                AND a.street = 'preflop'
-                AND (
-                    a.action_type IN ('raise', 'call')
-                    OR (a.action_type = 'bet' AND a.amount > 0)
-                    OR (
-                        a.action_type = 'blind'
-                        AND EXISTS (
-                            SELECT 1 
-                            FROM actions a2 
-                            WHERE a2.hand_id = a.hand_id 
-                                AND a2.player_id = a.player_id
-                                AND a2.street = 'preflop'
-                                AND a2.action_type IN ('call', 'raise', 'check')
-                        )
-                    )
-                )
-            GROUP BY p.name, hp.hand_id
-        ),
-        StealOpportunities AS (
-            -- Hands where player could steal from BTN, CO, or HJ (using relative positions)
-            SELECT DISTINCT
-                p.name,
-                hp.hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN actions a ON hp.hand_id = a.hand_id 
-                AND hp.player_id = a.player_id
-                AND a.street = 'preflop'
-            JOIN (
-                SELECT 
-                    h.hand_id,
-                    h.total_players,
-                    hp_sb.position as sb_position,
-                    CASE 
-                        WHEN hp_sb.position - 3 < 1 THEN h.total_players - (3 - hp_sb.position)
-                        ELSE hp_sb.position - 3
-                    END as hj_position,
-                    CASE 
-                        WHEN hp_sb.position - 2 < 1 THEN h.total_players - (2 - hp_sb.position)
-                        ELSE hp_sb.position - 2
-                    END as co_position,
-                    CASE 
-                        WHEN hp_sb.position - 1 < 1 THEN h.total_players
-                        ELSE hp_sb.position - 1
-                    END as btn_position
-                FROM hands h
-                JOIN hand_players hp_sb ON h.hand_id = hp_sb.hand_id
-                JOIN actions a_sb ON hp_sb.hand_id = a_sb.hand_id 
-                    AND hp_sb.player_id = a_sb.player_id
-                    AND a_sb.action_type = 'blind'
-                WHERE a_sb.sequence_number = 1
-            ) positions ON hp.hand_id = positions.hand_id
-            WHERE p.name IN ({})
-                AND hp.position IN (positions.hj_position, positions.co_position, positions.btn_position)
-                AND NOT EXISTS (
-                    SELECT 1 
-                    FROM actions a2
-                    WHERE a2.hand_id = a.hand_id
-                        AND a2.sequence_number < a.sequence_number
-                        AND a2.action_type IN ('call', 'raise')
-                )
-            GROUP BY p.name, hp.hand_id
-        ),
-        StealAttempts AS (
-            -- Actual steal attempts from late position
-            SELECT DISTINCT
-                p.name,
-                hp.hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN actions a ON hp.hand_id = a.hand_id 
-                AND hp.player_id = a.player_id
-                AND a.street = 'preflop'
-                AND a.action_type = 'raise'
-            JOIN (
-                SELECT 
-                    h.hand_id,
-                    h.total_players,
-                    hp_sb.position as sb_position,
-                    CASE 
-                        WHEN hp_sb.position - 3 < 1 THEN h.total_players - (3 - hp_sb.position)
-                        ELSE hp_sb.position - 3
-                    END as hj_position,
-                    CASE 
-                        WHEN hp_sb.position - 2 < 1 THEN h.total_players - (2 - hp_sb.position)
-                        ELSE hp_sb.position - 2
-                    END as co_position,
-                    CASE 
-                        WHEN hp_sb.position - 1 < 1 THEN h.total_players
-                        ELSE hp_sb.position - 1
-                    END as btn_position
-                FROM hands h
-                JOIN hand_players hp_sb ON h.hand_id = hp_sb.hand_id
-                JOIN actions a_sb ON hp_sb.hand_id = a_sb.hand_id 
-                    AND hp_sb.player_id = a_sb.player_id
-                    AND a_sb.action_type = 'blind'
-                WHERE a_sb.sequence_number = 1
-            ) positions ON hp.hand_id = positions.hand_id
-            WHERE p.name IN ({})
-                AND hp.position IN (positions.hj_position, positions.co_position, positions.btn_position)
-                AND NOT EXISTS (
-                    SELECT 1 
-                    FROM actions a2
-                    WHERE a2.hand_id = a.hand_id
-                        AND a2.sequence_number < a.sequence_number
-                        AND a2.action_type IN ('call', 'raise')
-                )
-            GROUP BY p.name, hp.hand_id
-        ),
-        ISOOpportunities AS (
-            -- Hands where there was a limp before the player acted
-            SELECT DISTINCT
-                p.name,
-                a1.hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN actions a1 ON hp.hand_id = a1.hand_id 
-                AND hp.player_id = a1.player_id
-                AND a1.street = 'preflop'
-            WHERE p.name IN ({})
-                AND EXISTS (
-                    SELECT 1 
-                    FROM actions a2
-                    JOIN players p2 ON a2.player_id = p2.player_id
-                    WHERE a2.hand_id = a1.hand_id 
-                        AND p2.name != p.name
-                        AND a2.sequence_number < a1.sequence_number
-                        AND a2.action_type = 'call'
-                        AND a2.street = 'preflop'
-                        AND NOT EXISTS (
-                            -- Make sure no raise before the limp
-                            SELECT 1
-                            FROM actions a3
-                            WHERE a3.hand_id = a2.hand_id
-                                AND a3.sequence_number < a2.sequence_number
-                                AND a3.action_type = 'raise'
-                                AND a3.street = 'preflop'
-                        )
-                )
-            GROUP BY p.name, a1.hand_id
-        ),
-        ISOAttempts AS (
-            -- Actual isolation raises over limpers
-            SELECT DISTINCT
-                p.name,
-                a1.hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN actions a1 ON hp.hand_id = a1.hand_id 
-                AND hp.player_id = a1.player_id
-                AND a1.action_type = 'raise'
-                AND a1.street = 'preflop'
-            WHERE p.name IN ({})
-                AND EXISTS (
-                    SELECT 1 
-                    FROM actions a2
-                    JOIN players p2 ON a2.player_id = p2.player_id
-                    WHERE a2.hand_id = a1.hand_id 
-                        AND p2.name != p.name
-                        AND a2.sequence_number < a1.sequence_number
-                        AND a2.action_type = 'call'
-                        AND a2.street = 'preflop'
-                        AND NOT EXISTS (
-                            -- Make sure no raise before the limp
-                            SELECT 1
-                            FROM actions a3
-                            WHERE a3.hand_id = a2.hand_id
-                                AND a3.sequence_number < a2.sequence_number
-                                AND a3.action_type = 'raise'
-                                AND a3.street = 'preflop'
-                        )
-                )
-            GROUP BY p.name, a1.hand_id
-        ),
-        ThreeBetOpportunities AS (
-            -- Hands where there was a raise before the player acted
-            SELECT DISTINCT
-                p.name,
-                a1.hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN actions a1 ON hp.hand_id = a1.hand_id 
-                AND hp.player_id = a1.player_id
-                AND a1.street = 'preflop'
-            WHERE p.name IN ({})
-                AND EXISTS (
-                    SELECT 1 
-                    FROM actions a2
-                    JOIN players p2 ON a2.player_id = p2.player_id
-                    WHERE a2.hand_id = a1.hand_id 
-                        AND p2.name != p.name
-                        AND a2.sequence_number < a1.sequence_number
-                        AND a2.action_type = 'raise'
-                        AND a2.street = 'preflop'
-                )
-            GROUP BY p.name, a1.hand_id
-        ),
-        ThreeBets AS (
-            -- Actual 3bets made by player
-            SELECT DISTINCT
-                p.name,
-                a1.hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN actions a1 ON hp.hand_id = a1.hand_id 
-                AND hp.player_id = a1.player_id
-                AND a1.action_type = 'raise'
-                AND a1.street = 'preflop'
-            WHERE p.name IN ({})
-                AND EXISTS (
-                    SELECT 1 
-                    FROM actions a2
-                    JOIN players p2 ON a2.player_id = p2.player_id
-                    WHERE a2.hand_id = a1.hand_id 
-                        AND p2.name != p.name
-                        AND a2.sequence_number < a1.sequence_number
-                        AND a2.action_type = 'raise'
-                        AND a2.street = 'preflop'
-                )
-            GROUP BY p.name, a1.hand_id
-        ),
-        RiverHands AS (
-            -- Hands that reached the river
-            SELECT DISTINCT
-                p.name,
-                CASE 
-                    WHEN a.hand_id IS NOT NULL THEN a.hand_id
-                    ELSE hp.hand_id
-                END as hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            LEFT JOIN actions a ON hp.hand_id = a.hand_id
-                AND hp.player_id = a.player_id
-                AND a.street = 'river'
-            WHERE p.name IN ({})
-                AND (a.hand_id IS NOT NULL OR hp.cards_shown IS NOT NULL)
-        ),
-        Showdowns AS (
-            -- Hands where cards were shown
-            SELECT DISTINCT
-                p.name,
-                hp.hand_id,
-                hp.cards_shown,
-                h.board_cards,
-                hp.net_result
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN hands h ON hp.hand_id = h.hand_id
-            WHERE p.name IN ({})
-                AND hp.cards_shown IS NOT NULL
-        ),
-        WonHands AS (
-            -- Hands won at showdown
-            SELECT 
-                s.name,
-                s.hand_id
-            FROM Showdowns s
-            JOIN hand_players hp ON s.hand_id = hp.hand_id
-            JOIN players p ON hp.player_id = p.player_id
-            WHERE p.name = s.name
-                AND hp.net_result > 0
-        ),
-        RFIOpportunities AS (
-            -- Get hands where player had opportunity to raise first in (folded to them)
-            SELECT DISTINCT
-                p.name,
-                hp.hand_id
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN actions a ON hp.hand_id = a.hand_id 
-                AND hp.player_id = a.player_id
-                AND a.street = 'preflop'
-            WHERE p.name IN ({})
-                AND NOT EXISTS (
-                    SELECT 1 
-                    FROM actions a2
-                    WHERE a2.hand_id = a.hand_id
-                        AND a2.sequence_number < a.sequence_number
-                        AND a2.action_type IN ('raise', 'call')
-                )
-            GROUP BY p.name, hp.hand_id
-        ),
-        RFITaken AS (
-            -- Get hands where player actually raised first in (folded to them)
-            SELECT DISTINCT
-                p.name,
-                a1.hand_id,
-                hp.position,
-                h.button_position,
-                h.total_players,
-                hp.cards_shown,
-                a1.amount,
-                hp.net_result
-            FROM players p
-            JOIN hand_players hp ON p.player_id = hp.player_id
-            JOIN hands h ON hp.hand_id = h.hand_id
-            JOIN actions a1 ON hp.hand_id = a1.hand_id 
-                AND hp.player_id = a1.player_id
-                AND a1.action_type = 'raise'
-                AND a1.street = 'preflop'
-            WHERE p.name IN ({})
-                AND NOT EXISTS (
-                    SELECT 1 
-                    FROM actions a2
-                    WHERE a2.hand_id = a1.hand_id
-                        AND a2.sequence_number < a1.sequence_number
-                        AND a2.action_type IN ('raise', 'call')
+            queries = self._stmt_cache.get(len(players))
+            if queries is None:
+                if len(players) == 1:
+                    placeholders = '= ?'
+                else:
+                    placeholders = f"IN ({','.join('?' * len(players))})"
+                queries = tuple(
+                    q.format(players=placeholders)
+                    for q in (_STATS_QUERY, _SHOWDOWN_DETAILS_QUERY, _RFI_DETAILS_QUERY)
                 )
-            GROUP BY p.name, a1.hand_id
-        )
-        SELECT 
-            ph.name,
-            COUNT(DISTINCT ph.hand_id) as total_hands,
-            COUNT(DISTINCT v.hand_id) as vpip_hands,
-            COUNT(DISTINCT tbo.hand_id) as threeb_opportunities,
-            COUNT(DISTINCT tb.hand_id) as threeb_count,
-            COUNT(DISTINCT r.hand_id) as river_hands,
-            COUNT(DISTINCT s.hand_id) as showdown_hands,
-            COUNT(DISTINCT w.hand_id) as won_hands,
-            COUNT(DISTINCT rfi_opp.hand_id) as rfi_opportunities,
-            COUNT(DISTINCT rfi.hand_id) as rfi_count,
-            COUNT(DISTINCT st_opp.hand_id) as steal_opportunities,
-            COUNT(DISTINCT st.hand_id) as steal_attempts,
-            COUNT(DISTINCT iso_opp.hand_id) as iso_opportunities,
-            COUNT(DISTINCT iso.hand_id) as iso_attempts,
-            GROUP_CONCAT(DISTINCT 
-                CASE 
-                    WHEN s.hand_id IS NOT NULL 
-                    THEN s.hand_id || '|' || COALESCE(s.cards_shown, '') || '|' || 
-                         COALESCE(s.board_cards, '') || '|' || COALESCE(s.net_result, '')
-                END
-            ) as showdown_details,
-            GROUP_CONCAT(DISTINCT 
-                CASE 
-                    WHEN rfi.hand_id IS NOT NULL 
-                    THEN rfi.hand_id || '|' || COALESCE(rfi.position, '') || '|' || 
-                         COALESCE(rfi.button_position, '') || '|' || COALESCE(rfi.total_players, '') || '|' ||
-                         COALESCE(rfi.cards_shown, '') || '|' || COALESCE(rfi.amount, '') || '|' ||
-                         COALESCE(rfi.net_result, '')
-                END
-            ) as rfi_details
-        FROM PlayerHands ph
-        LEFT JOIN VPIPHands v ON ph.name = v.name AND ph.hand_id = v.hand_id
-        LEFT JOIN ThreeBetOpportunities tbo ON ph.name = tbo.name AND ph.hand_id = tbo.hand_id
-        LEFT JOIN ThreeBets tb ON ph.name = tb.name AND ph.hand_id = tb.hand_id
-        LEFT JOIN RiverHands r ON ph.name = r.name AND ph.hand_id = r.hand_id
-        LEFT JOIN Showdowns s ON ph.name = s.name AND ph.hand_id = s.hand_id
-        LEFT JOIN WonHands w ON ph.name = w.name AND ph.hand_id = w.hand_id
-        LEFT JOIN RFIOpportunities rfi_opp ON ph.name = rfi_opp.name AND ph.hand_id = rfi_opp.hand_id
-        LEFT JOIN RFITaken rfi ON ph.name = rfi.name AND ph.hand_id = rfi.hand_id
-        LEFT JOIN StealOpportunities st_opp ON ph.name = st_opp.name AND ph.hand_id = st_opp.hand_id
-        LEFT JOIN StealAttempts st ON ph.name = st.name AND ph.hand_id = st.hand_id
-        LEFT JOIN ISOOpportunities iso_opp ON ph.name = iso_opp.name AND ph.hand_id = iso_opp.hand_id
-        LEFT JOIN ISOAttempts iso ON ph.name = iso.name AND ph.hand_id = iso.hand_id
-        GROUP BY ph.name"""
+                self._stmt_cache[len(players)] = queries
+            stats_query, showdown_query, rfi_query = queries
         
-        placeholders = ','.join('?' * len(players))
-        query = query.format(placeholders, placeholders, placeholders, placeholders, placeholders, 
-                           placeholders, placeholders, placeholders, placeholders, placeholders,
-                           placeholders, placeholders)
+            cursor = self.conn.cursor()
+            cursor.arraysize = 4096
         
-        cursor = self.conn.cursor()
-        cursor.execute(query, players * 12)
+            # The connection autocommits, so read all three queries in one
+            # transaction: otherwise each sees its own snapshot while the collector
+            # writes, and the counts can disagree with the details
+            cursor.execute("BEGIN")
+            try:
+                # Showdown hands per player: (hand_id, cards, board, result)
+                showdown_details_by_name = {}
+                cursor.execute(showdown_query, players)
+                for batch in iter(cursor.fetchmany, []):
+                    for name, hand_id, cards, board, result in batch:
+                        showdown_details_by_name.setdefault(name, []).append((hand_id, cards, board, result))
+            
+                # RFI hands per player: (hand_id, position, cards, amount, result)
+                rfi_details_by_name = {}
+                cursor.execute(rfi_query, players)
+                for batch in iter(cursor.fetchmany, []):
+                    for name, hand_id, position, cards, amount, result in batch:
+                        rfi_details_by_name.setdefault(name, []).append((hand_id, position, cards, amount, result))
+            
+                cursor.execute(stats_query, players)
+                stats_rows = cursor.fetchall()
+            finally:
+                cursor.execute("COMMIT")
         
         results = {}
-        for row in cursor.fetchall():
+        for row in stats_rows:
             (name, total_hands, vpip_hands, threeb_opportunities, threeb_count, 
              river_hands, showdown_hands, won_hands, rfi_opportunities, rfi_count,
              steal_opportunities, steal_attempts, iso_opportunities, iso_attempts,
-             showdown_details_str, rfi_details_str) = row
-            
-            vpip_percentage = (vpip_hands / total_hands * 100) if total_hands > 0 else 0
-            showdown_percentage = (showdown_hands / vpip_hands * 100) if vpip_hands > 0 else 0
-            wtsd_percentage = (showdown_hands / vpip_hands * 100) if vpip_hands > 0 else 0
-            w_sd_percentage = (won_hands / showdown_hands * 100) if showdown_hands > 0 else 0
-            rfi_percentage = (rfi_count / total_hands * 100) if total_hands > 0 else 0
-            iso_percentage = (iso_attempts / iso_opportunities * 100) if iso_opportunities > 0 else 0
-
-            # Parse showdown details
-            showdown_details = []
-            if showdown_details_str:
-                for detail in showdown_details_str.split(','):
-                    if detail:
-                        hand_id, cards, board, result = detail.split('|')
-                        showdown_details.append((hand_id, cards, board, float(result)))
-            
-            # Parse RFI details with position calculation
-            rfi_details = []
-            if rfi_details_str:
-                for detail in rfi_details_str.split(','):
-                    if detail:
-                        parts = detail.split('|')
-                        hand_id = parts[0]
-                        seat = int(parts[1]) if parts[1] else 0
-                        button_seat = int(parts[2]) if parts[2] else 0
-                        total_players = int(parts[3]) if parts[3] else 0
-                        cards = parts[4] if len(parts) > 4 else ''
-                        amount = float(parts[5]) if len(parts) > 5 and parts[5] else 0.0
-                        result = float(parts[6]) if len(parts) > 6 and parts[6] else 0.0
-                        
-                        # Calculate position name
-                        if seat and button_seat and total_players:
-                            position = self.get_position_name(seat, button_seat, total_players)
-                        else:
-                            # Try to calculate button position from actions if missing
-                            if seat:
-                                calc_button, calc_total = self._calculate_button_from_actions(hand_id)
-                                if calc_button and calc_total:
-                                    position = self.get_position_name(seat, calc_button, calc_total)
-                                else:
-                                    position = f"Seat {seat}"
-                            else:
-                                position = "Unknown"
-                        
-                        rfi_details.append((hand_id, position, cards, amount, result))
+             vpip_percentage, showdown_percentage, w_sd_percentage,
+             rfi_percentage, iso_percentage) = row
+            showdown_percentage = round(showdown_percentage, 1)
             
             results[name] = PlayerStats(
                 name=name,
@@ -561,9 +405,9 @@ class PokerStatsCalculator:
                 threeb_count=threeb_count,
                 river_reached=river_hands,
                 showdown_count=showdown_hands,
-                showdown_percentage=round(showdown_percentage, 1),
+                showdown_percentage=showdown_percentage,
                 won_at_showdown=won_hands,
-                wtsd_percentage=round(wtsd_percentage, 1),
+                wtsd_percentage=showdown_percentage,
                 w_sd_percentage=round(w_sd_percentage, 1),
                 rfi_opportunities=rfi_opportunities,
                 rfi_count=rfi_count,
@@ -573,13 +417,25 @@ class PokerStatsCalculator:
                 iso_opportunities=iso_opportunities,
                 iso_attempts=iso_attempts,
                 iso_percentage=round(iso_percentage, 1),
-                showdown_details=showdown_details,
-                rfi_details=rfi_details
+                showdown_details=showdown_details_by_name.get(name, []),
+                rfi_details=rfi_details_by_name.get(name, [])
             )
             
-        self.close()
         return results
 
+_calculators: Dict[str, PokerStatsCalculator] = {}
+_calculators_lock = threading.Lock()
+
+def get_calculator(db_path: str = "poker_analysis.db") -> PokerStatsCalculator:
+    """Return a connected calculator for db_path, reused across calls."""
+    key = str(Path(db_path).resolve())
+    with _calculators_lock:
+        calculator = _calculators.get(key)
+        if calculator is None:
+            calculator = _calculators[key] = PokerStatsCalculator(db_path=key)
+    calculator.connect()
+    return calculator
+
 def print_stats(stats: Dict[str, PlayerStats]):
     """Pretty print all statistics including showdown hands and RFI hands."""
     print("\nPlayer Statistics:")
@@ -622,13 +478,15 @@ def print_stats(stats: Dict[str, PlayerStats]):
                 print(f"{hand_id:<20} {cards:<15} {board:<30} {result:>10.2f}")
             print()
 
-if __name__ == "__main__":
+def main():
     parser = argparse.ArgumentParser(description='Calculate poker statistics for players')
     parser.add_argument('players', nargs='+', help='One or more player names to analyze')
     parser.add_argument('--db', default='poker_analysis.db', help='Path to the database file')
     
     args = parser.parse_args()
     
-    calculator = PokerStatsCalculator(db_path=args.db)
-    stats = calculator.calculate_stats(args.players)
+    stats = get_calculator(args.db).calculate_stats(args.players)
     print_stats(stats)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,26 @@
-import sqlite3
 import argparse
+import heapq
+from operator import attrgetter
 from typing import Dict, List
 import requests
-from bs4 import BeautifulSoup
 from Stats import PokerStatsCalculator, PlayerStats
+from http_session import create_session, conditional_get
+from html_tables import parse_table_rows
+
+# PlayerStats fields averaged as whole numbers and as one-decimal percentages
+_COUNT_FIELDS = (
+    'total_hands', 'vpip_hands', 'threeb_opportunities', 'threeb_count',
+    'river_reached', 'showdown_count', 'won_at_showdown', 'rfi_opportunities',
+    'rfi_count', 'steal_opportunities', 'steal_attempts', 'iso_opportunities',
+    'iso_attempts'
+)
+_PERCENTAGE_FIELDS = (
+    'vpip_percentage', 'showdown_percentage', 'wtsd_percentage',
+    'w_sd_percentage', 'rfi_percentage', 'iso_percentage'
+)
+
+# Standings status values of players still in the tournament
+_ACTIVE_STATUSES = frozenset({'in', 'folded', 'AWOL', 'Gone'})
 
 class AverageStatsCalculator:
     def __init__(self, db_path: str = "poker_analysis.db"):
@@ -11,16 +28,18 @@ class AverageStatsCalculator:
         self.db_path = db_path
         self.calculator = PokerStatsCalculator(db_path)
         self.conn = None
+        self.session = create_session()
 
     def connect(self):
-        """Establish database connection."""
+        """Establish database connection (shared with the stats calculator)."""
         if not self.conn:
-            self.conn = sqlite3.connect(self.db_path)
+            self.calculator.connect()
+            self.conn = self.calculator.conn
     
     def close(self):
         """Close database connection."""
         if self.conn:
-            self.conn.close()
+            self.calculator.close()
             self.conn = None
 
     def get_active_players_from_standings(self, url: str = "http://www.wrgpt.org/wrgpt_standings.php") -> List[str]:
@@ -34,31 +53,27 @@ class AverageStatsCalculator:
             List of active player names
         """
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
+            text = conditional_get(self.session, url)
             
             # Find the standings table - look for rows with player data
             active_players = []
             
             # The active players have a "Status" column, eliminated players have "Table - Hand - Prize"
             # We'll look for rows that contain status indicators like "in", "folded", "AWOL", "Gone"
-            rows = soup.find_all('tr')
+            rows = parse_table_rows(text)
             
-            for row in rows:
-                cols = row.find_all('td')
+            for cols in rows:
                 if len(cols) >= 5:  # Should have rank, player, bankroll, table, pot, status columns
                     # Check if this looks like an active player row (has numeric rank, player name, and status)
-                    rank_text = cols[0].get_text(strip=True)
-                    player_name = cols[1].get_text(strip=True)
+                    rank_text = cols[0]
+                    player_name = cols[1]
                     
                     # Active players have numeric ranks and status in later columns
                     # Eliminated players have ranks but different format
                     if rank_text.isdigit() and len(cols) >= 6:
-                        status_col = cols[5].get_text(strip=True)
+                        status_col = cols[5]
                         # Active players have status like "in", "folded", "AWOL", "Gone"
-                        if status_col in ['in', 'folded', 'AWOL', 'Gone']:
+                        if status_col in _ACTIVE_STATUSES:
                             active_players.append(player_name)
             
             if not active_players:
@@ -83,24 +98,26 @@ class AverageStatsCalculator:
         Returns:
             PlayerStats object representing the average player
         """
-        # Get player list based on filter
-        if use_active_only:
-            url = standings_url or "http://www.wrgpt.org/wrgpt_standings.php"
-            players_to_analyze = self.get_active_players_from_standings(url)
-        else:
-            # Get all players from database
-            self.connect()
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT DISTINCT name FROM players ORDER BY name")
-            players_to_analyze = [row[0] for row in cursor.fetchall()]
+        # One connection serves both the player list and the stats query
+        self.connect()
+        try:
+            # Get player list based on filter
+            if use_active_only:
+                url = standings_url or "http://www.wrgpt.org/wrgpt_standings.php"
+                players_to_analyze = self.get_active_players_from_standings(url)
+            else:
+                # Get all players from database
+                cursor = self.conn.execute("SELECT DISTINCT name FROM players ORDER BY name")
+                players_to_analyze = [name for (name,) in cursor]
+            
+            if not players_to_analyze:
+                raise ValueError("No players found")
+            
+            # Calculate stats for all players
+            all_stats = self.calculator.calculate_stats(players_to_analyze)
+        finally:
             self.close()
         
-        if not players_to_analyze:
-            raise ValueError("No players found")
-        
-        # Calculate stats for all players
-        all_stats = self.calculator.calculate_stats(players_to_analyze)
-        
         # Filter out players with no stats (might not be in DB yet)
         qualified_stats = {
             name: stats for name, stats in all_stats.items() 
@@ -113,49 +130,18 @@ class AverageStatsCalculator:
         num_players = len(qualified_stats)
         print(f"\nCalculating averages across {num_players} players")
         
-        # Calculate averages
-        avg_total_hands = sum(s.total_hands for s in qualified_stats.values()) / num_players
-        avg_vpip_hands = sum(s.vpip_hands for s in qualified_stats.values()) / num_players
-        avg_vpip_percentage = sum(s.vpip_percentage for s in qualified_stats.values()) / num_players
-        avg_threeb_opportunities = sum(s.threeb_opportunities for s in qualified_stats.values()) / num_players
-        avg_threeb_count = sum(s.threeb_count for s in qualified_stats.values()) / num_players
-        avg_river_reached = sum(s.river_reached for s in qualified_stats.values()) / num_players
-        avg_showdown_count = sum(s.showdown_count for s in qualified_stats.values()) / num_players
-        avg_showdown_percentage = sum(s.showdown_percentage for s in qualified_stats.values()) / num_players
-        avg_won_at_showdown = sum(s.won_at_showdown for s in qualified_stats.values()) / num_players
-        avg_wtsd_percentage = sum(s.wtsd_percentage for s in qualified_stats.values()) / num_players
-        avg_w_sd_percentage = sum(s.w_sd_percentage for s in qualified_stats.values()) / num_players
-        avg_rfi_opportunities = sum(s.rfi_opportunities for s in qualified_stats.values()) / num_players
-        avg_rfi_count = sum(s.rfi_count for s in qualified_stats.values()) / num_players
-        avg_rfi_percentage = sum(s.rfi_percentage for s in qualified_stats.values()) / num_players
-        avg_steal_opportunities = sum(s.steal_opportunities for s in qualified_stats.values()) / num_players
-        avg_steal_attempts = sum(s.steal_attempts for s in qualified_stats.values()) / num_players
-        avg_iso_opportunities = sum(s.iso_opportunities for s in qualified_stats.values()) / num_players
-        avg_iso_attempts = sum(s.iso_attempts for s in qualified_stats.values()) / num_players
-        avg_iso_percentage = sum(s.iso_percentage for s in qualified_stats.values()) / num_players
+        # Calculate averages: one pass pulls every field, zip(*) turns the rows into columns
+        rows = map(attrgetter(*_COUNT_FIELDS, *_PERCENTAGE_FIELDS), qualified_stats.values())
+        averages = dict(zip(
+            _COUNT_FIELDS + _PERCENTAGE_FIELDS,
+            (sum(column) / num_players for column in zip(*rows))
+        ))
         
         # Create average PlayerStats object
         avg_stats = PlayerStats(
             name="Average Player",
-            total_hands=int(round(avg_total_hands)),
-            vpip_hands=int(round(avg_vpip_hands)),
-            vpip_percentage=round(avg_vpip_percentage, 1),
-            threeb_opportunities=int(round(avg_threeb_opportunities)),
-            threeb_count=int(round(avg_threeb_count)),
-            river_reached=int(round(avg_river_reached)),
-            showdown_count=int(round(avg_showdown_count)),
-            showdown_percentage=round(avg_showdown_percentage, 1),
-            won_at_showdown=int(round(avg_won_at_showdown)),
-            wtsd_percentage=round(avg_wtsd_percentage, 1),
-            w_sd_percentage=round(avg_w_sd_percentage, 1),
-            rfi_opportunities=int(round(avg_rfi_opportunities)),
-            rfi_count=int(round(avg_rfi_count)),
-            rfi_percentage=round(avg_rfi_percentage, 1),
-            steal_opportunities=int(round(avg_steal_opportunities)),
-            steal_attempts=int(round(avg_steal_attempts)),
-            iso_opportunities=int(round(avg_iso_opportunities)),
-            iso_attempts=int(round(avg_iso_attempts)),
-            iso_percentage=round(avg_iso_percentage, 1),
+            **{field: int(round(averages[field])) for field in _COUNT_FIELDS},
+            **{field: round(averages[field], 1) for field in _PERCENTAGE_FIELDS},
             showdown_details=None,  # No details for average
             rfi_details=None  # No details for average
         )
@@ -187,9 +173,8 @@ def print_average_stats(stats: PlayerStats):
 
 def print_top_players(stats_dict: Dict[str, PlayerStats], num_players: int = 10):
     """Print full statistics for top N players by VPIP."""
-    # Sort players by VPIP percentage (descending)
-    sorted_players = sorted(stats_dict.items(), key=lambda x: x[1].vpip_percentage, reverse=True)
-    top_players = sorted_players[:num_players]
+    # Highest VPIP percentage first (same order and tie-breaking as a full descending sort)
+    top_players = heapq.nlargest(num_players, stats_dict.items(), key=lambda x: x[1].vpip_percentage)
     
     print(f"\nTop {len(top_players)} Players by VPIP:")
     print("-" * 130)
@@ -1,43 +1,122 @@
 import sqlite3
 from pathlib import Path
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_PLAYER_SQL = """
+    INSERT INTO players (name, last_seen_date)
+    VALUES (?, ?)
+    ON CONFLICT(name) DO UPDATE SET last_seen_date = excluded.last_seen_date
+"""
+
+_PLAYER_IDS_SQL = """
+    SELECT name, player_id FROM players
+    WHERE name IN ({names})
+"""
+
+_ADD_HAND_SQL = """
+    INSERT OR REPLACE INTO hands (
+        hand_id, table_id, date_played, small_blind_amount,
+        big_blind_amount, button_position, total_players,
+        board_cards, total_pot
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_ADD_HAND_PLAYER_SQL = """
+    INSERT INTO hand_players (
+        hand_id, player_id, position, starting_stack,
+        net_result, cards_shown
+    ) VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+_ADD_ACTION_SQL = """
+    INSERT INTO actions (
+        hand_id, player_id, street, action_type,
+        amount, is_all_in, sequence_number
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_IS_HAND_PROCESSED_SQL = """
+    SELECT 1 FROM processed_hands
+    WHERE table_id = ? AND hand_number = ?
+"""
+
+_PROCESSED_HAND_NUMBERS_SQL = """
+    SELECT hand_number FROM processed_hands
+    WHERE table_id = ?
+"""
+
+_MARK_HAND_PROCESSED_SQL = """
+    INSERT INTO processed_hands (table_id, hand_number, processed_time)
+    VALUES (?, ?, datetime('now'))
+"""
+
+_HAS_TABLE_SQL = """
+    SELECT 1 FROM sqlite_master
+    WHERE type = 'table' AND name = ?
+"""
+
+_HAS_HANDS_SQL = """
+    SELECT 1 FROM hands LIMIT 1
+"""
 
 class PokerDBManager:
     def __init__(self, db_path: str = "poker_analysis.db"):
         """Initialize database manager with path to SQLite database."""
         self.db_path = db_path
         self.conn: Optional[sqlite3.Connection] = None
-        self._setup_logging()
-        
-    def _setup_logging(self):
-        """Set up logging configuration."""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
-        self.logger = logging.getLogger(__name__)
+        # One cursor reused by every statement on this connection
+        self._cursor: Optional[sqlite3.Cursor] = None
 
     def connect(self) -> None:
         """Establish database connection."""
         try:
             self.conn = sqlite3.connect(self.db_path)
-            self.conn.execute("PRAGMA foreign_keys = ON")
-            self.logger.info(f"Connected to database at {self.db_path}")
+            self.conn.executescript("""
+                PRAGMA foreign_keys = ON;
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                PRAGMA temp_store = MEMORY;
+                PRAGMA cache_size = -65536;
+            """)
+            self._cursor = self.conn.cursor()
+            logger.info("Connected to database at %s", self.db_path)
         except sqlite3.Error as e:
-            self.logger.error(f"Error connecting to database: {e}")
+            logger.error("Error connecting to database: %s", e)
             raise
 
     def close(self) -> None:
         """Close database connection."""
         if self.conn:
-            self.conn.close()
-            self.conn = None
-            self.logger.info("Database connection closed")
+            try:
+                self._refresh_statistics()
+            except sqlite3.Error as e:
+                logger.warning("Could not refresh planner statistics: %s", e)
+            finally:
+                self.conn.close()
+                self.conn = None
+                self._cursor = None
+            logger.info("Database connection closed")
+
+    def _refresh_statistics(self) -> None:
+        """Refresh planner statistics: one full ANALYZE once there is data to
+        measure, afterwards only what has drifted since."""
+        if not self.conn.execute(_HAS_TABLE_SQL, ('hands',)).fetchone():
+            return
+        if (self.conn.execute(_HAS_TABLE_SQL, ('sqlite_stat1',)).fetchone()
+                or not self.conn.execute(_HAS_HANDS_SQL).fetchone()):
+            self.conn.execute("PRAGMA optimize")
+        else:
+            self.conn.execute("ANALYZE")
 
     def initialize_database(self) -> None:
         """Create database tables if they don't exist."""
+        # One transaction for the whole schema rather than one per statement
         schema_sql = '''
+        BEGIN;
+
         -- Players table
         CREATE TABLE IF NOT EXISTS players (
             player_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -95,40 +174,59 @@ class PokerDBManager:
 
         -- Create indexes
         CREATE INDEX IF NOT EXISTS idx_hands_table ON hands(table_id);
-        CREATE INDEX IF NOT EXISTS idx_actions_hand ON actions(hand_id);
         CREATE INDEX IF NOT EXISTS idx_actions_player ON actions(player_id);
         CREATE INDEX IF NOT EXISTS idx_hand_players_player ON hand_players(player_id);
+
+        -- Covering indexes for the stats queries in Stats.py
+        CREATE INDEX IF NOT EXISTS idx_actions_hand_street_seq
+            ON actions(hand_id, street, sequence_number, action_type, amount, player_id);
+        CREATE INDEX IF NOT EXISTS idx_hand_players_player_hand
+            ON hand_players(player_id, hand_id, position);
+
+        -- Superseded by idx_actions_hand_street_seq, which leads with hand_id
+        DROP INDEX IF EXISTS idx_actions_hand;
+
+        COMMIT;
         '''
         
         try:
             if not self.conn:
                 self.connect()
             self.conn.executescript(schema_sql)
-            self.conn.commit()
-            self.logger.info("Database initialized successfully")
+            logger.info("Database initialized successfully")
         except sqlite3.Error as e:
-            self.logger.error(f"Error initializing database: {e}")
+            logger.error("Error initializing database: %s", e)
             raise
 
-    def add_player(self, name: str, last_seen_date: str) -> int:
-        """Add a new player or update existing player's last seen date."""
+    def begin_batch(self) -> None:
+        """Start a transaction; the add_*/mark_* methods below do not commit."""
+        if not self.conn:
+            self.connect()
+        self.conn.execute("BEGIN")
+
+    def commit_batch(self) -> None:
+        """Commit everything written since begin_batch()."""
+        self.conn.commit()
+
+    def rollback_batch(self) -> None:
+        """Discard everything written since begin_batch()."""
+        self.conn.rollback()
+
+    def add_players(self, names: List[str], last_seen_date: str) -> Dict[str, int]:
+        """Add or update several players at once and return their ids by name."""
         try:
             if not self.conn:
                 self.connect()
             
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO players (name, last_seen_date)
-                VALUES (?, ?)
-                ON CONFLICT(name) DO UPDATE SET last_seen_date = ?
-                RETURNING player_id
-            """, (name, last_seen_date, last_seen_date))
-            
-            player_id = cursor.fetchone()[0]
-            self.conn.commit()
-            return player_id
+            names = list(names)
+            self._cursor.executemany(_UPSERT_PLAYER_SQL, [(name, last_seen_date) for name in names])
+            self._cursor.execute(
+                _PLAYER_IDS_SQL.format(names=','.join('?' * len(names))),
+                names
+            )
+            return dict(self._cursor.fetchall())
         except sqlite3.Error as e:
-            self.logger.error(f"Error adding/updating player {name}: {e}")
+            logger.error("Error adding/updating players %s: %s", names, e)
             raise
 
     def add_hand(self, hand_data: Dict[str, Any]) -> None:
@@ -137,14 +235,7 @@ class PokerDBManager:
             if not self.conn:
                 self.connect()
             
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO hands (
-                    hand_id, table_id, date_played, small_blind_amount,
-                    big_blind_amount, button_position, total_players,
-                    board_cards, total_pot
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+            self._cursor.execute(_ADD_HAND_SQL, (
                 hand_data['hand_id'],
                 hand_data['table_id'],
                 hand_data['date_played'],
@@ -155,49 +246,35 @@ class PokerDBManager:
                 hand_data['board_cards'],
                 hand_data['total_pot']
             ))
-            self.conn.commit()
         except sqlite3.Error as e:
-            self.logger.error(f"Error adding hand {hand_data['hand_id']}: {e}")
+            logger.error("Error adding hand %s: %s", hand_data['hand_id'], e)
             raise
 
-    def add_hand_player(self, player_data: Dict[str, Any]) -> None:
-        """Add a player's participation in a hand."""
+    def add_hand_players(self, players: List[Dict[str, Any]]) -> None:
+        """Add every player's participation in a hand."""
         try:
             if not self.conn:
                 self.connect()
             
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO hand_players (
-                    hand_id, player_id, position, starting_stack,
-                    net_result, cards_shown
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
+            self._cursor.executemany(_ADD_HAND_PLAYER_SQL, [(
                 player_data['hand_id'],
                 player_data['player_id'],
                 player_data['position'],
                 player_data['starting_stack'],
                 player_data['net_result'],
                 player_data['cards_shown']
-            ))
-            self.conn.commit()
+            ) for player_data in players])
         except sqlite3.Error as e:
-            self.logger.error(f"Error adding hand player data: {e}")
+            logger.error("Error adding hand player data: %s", e)
             raise
 
-    def add_action(self, action_data: Dict[str, Any]) -> None:
-        """Add an action to the database."""
+    def add_actions(self, actions: List[Dict[str, Any]]) -> None:
+        """Add all actions of a hand to the database."""
         try:
             if not self.conn:
                 self.connect()
             
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO actions (
-                    hand_id, player_id, street, action_type,
-                    amount, is_all_in, sequence_number
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
+            self._cursor.executemany(_ADD_ACTION_SQL, [(
                 action_data['hand_id'],
                 action_data['player_id'],
                 action_data['street'],
@@ -205,10 +282,9 @@ class PokerDBManager:
                 action_data['amount'],
                 1 if action_data['is_all_in'] else 0,
                 action_data['sequence_number']
-            ))
-            self.conn.commit()
+            ) for action_data in actions])
         except sqlite3.Error as e:
-            self.logger.error(f"Error adding action: {e}")
+            logger.error("Error adding actions: %s", e)
             raise
 
     def is_hand_processed(self, table_id: str, hand_number: int) -> bool:
@@ -217,30 +293,34 @@ class PokerDBManager:
             if not self.conn:
                 self.connect()
             
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT 1 FROM processed_hands 
-                WHERE table_id = ? AND hand_number = ?
-            """, (table_id, hand_number))
+            self._cursor.execute(_IS_HAND_PROCESSED_SQL, (table_id, hand_number))
             
-            return cursor.fetchone() is not None
+            return self._cursor.fetchone() is not None
         except sqlite3.Error as e:
-            self.logger.error(f"Error checking processed hand: {e}")
+            logger.error("Error checking processed hand: %s", e)
             return False
 
+    def get_processed_hand_numbers(self, table_id: str) -> Set[int]:
+        """Get the numbers of all hands already processed for a table."""
+        try:
+            if not self.conn:
+                self.connect()
+            
+            self._cursor.execute(_PROCESSED_HAND_NUMBERS_SQL, (table_id,))
+            
+            return {row[0] for row in self._cursor.fetchall()}
+        except sqlite3.Error as e:
+            logger.error("Error fetching processed hands: %s", e)
+            return set()
+
     def mark_hand_processed(self, table_id: str, hand_number: int) -> None:
         """Mark a hand as processed."""
         try:
             if not self.conn:
                 self.connect()
             
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO processed_hands (table_id, hand_number, processed_time)
-                VALUES (?, ?, datetime('now'))
-            """, (table_id, hand_number))
+            self._cursor.execute(_MARK_HAND_PROCESSED_SQL, (table_id, hand_number))
             
-            self.conn.commit()
         except sqlite3.Error as e:
-            self.logger.error(f"Error marking hand as processed: {e}")
+            logger.error("Error marking hand as processed: %s", e)
             raise
\ No newline at end of file
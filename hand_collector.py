@@ -1,11 +1,22 @@
 import requests
 from hand_parser import HandParser
 from hand_store import HandStore
+from http_session import create_session, conditional_get, RateLimiter
 from typing import List, Optional
 import logging
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from dataclasses import dataclass
-from bs4 import BeautifulSoup
+from html_tables import parse_table_rows
+
+# Table statuses whose last listed hand is complete
+_FINISHED_STATUSES = frozenset({'Finished', 'Unk'})
+
+# Transient server errors worth retrying, and attempts per hand (first try plus retries)
+_RETRY_STATUSES = frozenset({502, 503, 504})
+_FETCH_ATTEMPTS = 4
 
 @dataclass
 class TableStatus:
@@ -14,16 +25,21 @@ class TableStatus:
     status: str
 
 class HandCollector:
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, requests_per_second: float = 8):
         self.parser = HandParser()
         self.store = HandStore()
         self._setup_logging()
         self.base_url = "http://hands.wrgpt.org/b"
+        # Hands are fetched concurrently; the limiter caps the total request rate
+        self.max_workers = max_workers
+        # All fetches go to one host: give every worker its own keep-alive connection.
+        # fetch_hand retries itself so that retries also wait for the rate limiter
+        self.session = create_session(pool_connections=1, pool_maxsize=max_workers, max_retries=0)
+        self.rate_limiter = RateLimiter(requests_per_second)
         
-        # Initialize database
+        # Initialize database; the connection stays open for the whole run
         self.store.db.connect()
         self.store.db.initialize_database()
-        self.store.db.close()
 
 
     def _setup_logging(self):
@@ -45,55 +61,68 @@ class HandCollector:
         """Parse the main status page to get all active tables and their hand numbers."""
         url = "http://hands.wrgpt.org/tablebytable.html"
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            text = response.text
-
-            # Parse the HTML using Beautiful Soup
-            soup = BeautifulSoup(text, 'html.parser')
+            text = conditional_get(self.session, url)
 
-            # Find the table (assuming it's the first table in the HTML)
-            table = soup.find('table')
+            # Cell texts of each row of the table (assuming it's the first table in the HTML)
+            rows = parse_table_rows(text, first_table_only=True)
 
             tables = []
             # Iterate through each row in the table
-            for row in table.find_all('tr')[1:]:  # Skip header row
-                columns = row.find_all('td')
+            for columns in rows[1:]:  # Skip header row
                 if len(columns) < 4:
                     continue  # Skip malformed rows
 
-                table_id = columns[0].text.strip()  # First column: Table ID
+                table_id = columns[0]  # First column: Table ID
                 try:
-                    hand_num = int(columns[1].text.strip())  # Second column: Hand number
+                    hand_num = int(columns[1])  # Second column: Hand number
                 except ValueError:
                     continue  # Skip lines where hand number isn't an integer
 
-                status = columns[3].text.strip()  # Fourth column: Status
+                status = columns[3]  # Fourth column: Status
 
                 # Only add the table if it is not "Broken"
                 if status != "Broken":
                     tables.append(TableStatus(table_id=table_id, current_hand=hand_num, status=status))
 
-            self.logger.info(f"Found {len(tables)} active tables")
+            self.logger.info("Found %s active tables", len(tables))
             return tables
 
         except requests.RequestException as e:
-            self.logger.error(f"Error fetching status page: {e}")
+            self.logger.error("Error fetching status page: %s", e)
             return []
         except Exception as e:
-            self.logger.error(f"Error parsing status page: {e}")
+            self.logger.error("Error parsing status page: %s", e)
             return []
 
     def fetch_hand(self, table_id: str, hand_number: int) -> Optional[str]:
-        """Fetch a single hand history."""
+        """Fetch a single hand history, retrying transient errors."""
         url = f"{self.base_url}/hands/{table_id}_{hand_number}.txt"
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            self.logger.warning(f"Could not fetch hand {table_id}_{hand_number}: {e}")
-            return None
+        for attempt in range(1, _FETCH_ATTEMPTS + 1):
+            # Every attempt, retries included, counts against the rate limit
+            self.rate_limiter.acquire()
+            self.logger.info("Fetching %s hand #%s", table_id, hand_number)
+            try:
+                response = self.session.get(url, timeout=10)
+                if response.status_code not in _RETRY_STATUSES or attempt == _FETCH_ATTEMPTS:
+                    response.raise_for_status()
+                    # Without a charset in the headers requests would sniff the body to guess
+                    # one; hand histories are plain text, so decode as ISO-8859-1 (requests'
+                    # own default for text/*) and skip the detection
+                    if response.encoding is None:
+                        response.encoding = 'ISO-8859-1'
+                    return response.text
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == _FETCH_ATTEMPTS:
+                    self.logger.warning("Could not fetch hand %s_%s: %s", table_id, hand_number, e)
+                    return None
+                error = e
+            except requests.RequestException as e:
+                self.logger.warning("Could not fetch hand %s_%s: %s", table_id, hand_number, e)
+                return None
+            self.logger.info("Retrying %s hand #%s after: %s", table_id, hand_number, error)
+            time.sleep(0.5 * 2 ** (attempt - 1))
+        return None
 
     def collect_hands_for_table(self, table_id: str, up_to_hand: int, status: str) -> None:
         """Collect all unprocessed hands for a specific table up to the current hand number."""
@@ -103,38 +132,55 @@ class HandCollector:
         
         # For finished tables and unknown status, include the last hand (it's complete).
         # For active tables (empty/whitespace status), exclude current hand (it's in progress).
-        end_hand = up_to_hand + 1 if status.strip() in ["Finished", "Unk"] else up_to_hand
+        end_hand = up_to_hand + 1 if status.strip() in _FINISHED_STATUSES else up_to_hand
         
-        self.logger.info(f"Collecting hands for table {table_id} (status: {status}) from hand {start_hand} up to hand {end_hand - 1}")
+        self.logger.info("Collecting hands for table %s (status: %s) from hand %s up to hand %s", table_id, status, start_hand, end_hand - 1)
         
-        for hand_num in range(start_hand, end_hand):
-            try:
-                # Check if we've already processed this hand
-                if self.store.db.is_hand_processed(table_id, hand_num):
-                    self.logger.info(f"Skipping {table_id} hand #{hand_num} - already processed")
-                    continue
-
-                self.logger.info(f"Fetching {table_id} hand #{hand_num}")
-                hand_text = self.fetch_hand(table_id, hand_num)
-                
-                if hand_text:
-                    # Parse and store the hand
-                    hand_data = self.parser.parse_hand(hand_text)
-                    self.store.store_hand(hand_data)
-                    
-                    # Mark this hand as processed
-                    self.store.db.mark_hand_processed(table_id, hand_num)
+        # Only fetch hands we haven't already processed
+        processed = self.store.db.get_processed_hand_numbers(table_id)
+        hand_nums = [h for h in range(start_hand, end_hand) if h not in processed]
+        skipped = max(end_hand - start_hand, 0) - len(hand_nums)
+        if skipped:
+            self.logger.info("Skipping %s already processed hands of table %s", skipped, table_id)
+
+        # Fetch concurrently (rate limited to be nice to the server), but parse
+        # and store on this thread, in hand order, so SQLite has a single writer.
+        # Only a small window of fetches is queued ahead, so an error or Ctrl-C
+        # doesn't wait for the rest of the table to download.
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        remaining = iter(hand_nums)
+        pending = deque(
+            (hand_num, executor.submit(self.fetch_hand, table_id, hand_num))
+            for hand_num in islice(remaining, 2 * self.max_workers)
+        )
+        try:
+            while pending:
+                hand_num, future = pending.popleft()
+                for next_num in islice(remaining, 1):
+                    pending.append((next_num, executor.submit(self.fetch_hand, table_id, next_num)))
+                try:
+                    hand_text = future.result()
+                    if hand_text:
+                        # Parse and store the hand, and mark it processed, in one transaction
+                        hand_data = self.parser.parse_hand(hand_text)
+                        self.store.db.begin_batch()
+                        try:
+                            self.store.store_hand(hand_data, commit=False)
+                            self.store.db.mark_hand_processed(table_id, hand_num)
+                            self.store.db.commit_batch()
+                        except Exception:
+                            self.store.db.rollback_batch()
+                            raise
+                        
+                        self.logger.info("Stored %s hand #%s", table_id, hand_num)
+                    else:
+                        self.logger.warning("Could not fetch %s hand #%s", table_id, hand_num)
                     
-                    self.logger.info(f"Stored {table_id} hand #{hand_num}")
-                else:
-                    self.logger.warning(f"Could not fetch {table_id} hand #{hand_num}")
-                
-                # Be nice to the server
-                time.sleep(1)
-                
-            except Exception as e:
-                self.logger.error(f"Error processing {table_id} hand #{hand_num}: {e}")
-                continue
+                except Exception as e:
+                    self.logger.error("Error processing %s hand #%s: %s", table_id, hand_num, e)
+                    continue
+        finally:
+            executor.shutdown(cancel_futures=True)
 
     def collect_all_hands(self) -> None:
         """Collect all unprocessed hands from all active tables."""
@@ -142,15 +188,18 @@ class HandCollector:
         tables = self.parse_status_page()
         total_tables = len(tables)
         
-        self.logger.info(f"Beginning collection for {total_tables} tables")
+        self.logger.info("Beginning collection for %s tables", total_tables)
         
         # Process each table
-        for idx, table in enumerate(tables, 1):
-            self.logger.info(f"Processing table {table.table_id} ({idx}/{total_tables}), current hand: {table.current_hand}, status: {table.status}")
-            self.collect_hands_for_table(table.table_id, table.current_hand, table.status)
-            
-            # Brief pause between tables
-            time.sleep(2)
+        try:
+            for idx, table in enumerate(tables, 1):
+                self.logger.info("Processing table %s (%s/%s), current hand: %s, status: %s", table.table_id, idx, total_tables, table.current_hand, table.status)
+                self.collect_hands_for_table(table.table_id, table.current_hand, table.status)
+                
+                # Brief pause between tables
+                time.sleep(2)
+        finally:
+            self.store.db.close()
 
 # If you need to run the collector
 if __name__ == "__main__":
@@ -4,6 +4,50 @@ from typing import Dict, List, Optional
 import logging
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Seat markers ("> ", "D ", "V ", in that order) in front of a player name
+_MARKER_RE = re.compile(r'^(?:> )?(?:D )?(?:V )?')
+_HEADER_RE = re.compile(r'Subject: \[([^]]+)\]\[hand:(\d+)\]')
+_DAY_RE = re.compile(r'! Table [^,]+, Hand \d+, Day (\d+)')
+# Handles D, >, V or space markers
+_PLAYER_RE = re.compile(r'(\d+)\|([DV>\s])\s*([^|\n]+?)\s*\|\s*([\d,]*)\s*\|\s*([\d,]*)\s*\|\s*([^|\n]*)\|')
+_RAISE_RE = re.compile(r'raises \$([\d,]+) to \$([\d,]+) total')
+_TOTAL_RE = re.compile(r'to \$([\d,]+) total')
+_AMOUNT_RE = re.compile(r'\$([\d,]+)')
+# One history line: the whole text after the timestamp is captured as `text`,
+# and exactly one of the innermost alternatives (named after the action type,
+# or dealing/flop/card for the deal and street changes) matches. Anchored to
+# line starts so the engine skips any line that does not open with "! "
+_ACTION_RE = re.compile(r"""
+    ^!\ (?P<ts>\d{2}/\d{2}/\d{2}\ \d{2}:\d{2}:\d{2})!\ (?=(?P<text>[^!\n]*))
+    (?:
+        (?P<dealing>Dealing)
+      | (?P<flop>Flopped\ cards:)
+      | (?P<card>Flopped\ card:)
+      | (?P<player>[^!\n]+?)\ (?:
+            (?P<blind>blinds\ \$(?P<blind_amount>[\d,]+))
+          | (?P<vacation_fold>(?i:is\ on\ vacation\ and\ folds))
+          | (?P<fold>folds)
+          | (?P<call>calls)
+          | (?P<raise>raises)
+          | (?P<check>checks)
+          | (?P<bet>bets)
+        )
+    )
+""", re.VERBOSE | re.MULTILINE)
+# Lines read from the whole hand after the actions; the last group of each
+# alternative (board, uncalled_player, cards, pot) identifies it
+_TAIL_RE = re.compile(r"""
+    !\ (?:
+        Hand\ over,\ current\ board\ is:\ \ (?P<board>[^\n]+)
+      | Uncalled\ bet\ \(\$(?P<uncalled>[\d,]+)\)\ returned\ to\ (?P<uncalled_player>[^!]+)
+      | (?P<shown_player>[^!]+?)\s+has:\s+(?P<cards>[^\n]+)
+      | (?P<winner>[^!]+?)\ wins\ \$(?P<pot>[\d,]+)
+    )
+""", re.VERBOSE)
 
 class Street(Enum):
     PREFLOP = 'preflop'
@@ -11,7 +55,10 @@ class Street(Enum):
     TURN = 'turn'
     RIVER = 'river'
 
-@dataclass
+# A single "Flopped card:" deals the turn after the flop and the river after the turn
+_NEXT_STREET = {Street.FLOP: Street.TURN, Street.TURN: Street.RIVER}
+
+@dataclass(slots=True)
 class HandAction:
     timestamp: datetime
     player: str
@@ -20,49 +67,37 @@ class HandAction:
     is_all_in: bool = False
     street: Street = Street.PREFLOP
 
-class HandParser:
-    def __init__(self):
-        self._setup_logging()
+def _parse_timestamp(timestamp: str) -> datetime:
+    """Parse an 'MM/DD/YY HH:MM:SS' history timestamp.
 
-    def _setup_logging(self):
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
-        self.logger = logging.getLogger(__name__)
+    Equivalent to strptime with '%m/%d/%y %H:%M:%S' (including its two-digit
+    year rule) but slices the fixed-width fields directly.
+    """
+    year = int(timestamp[6:8])
+    year += 2000 if year < 69 else 1900
+    return datetime(
+        year, int(timestamp[0:2]), int(timestamp[3:5]),
+        int(timestamp[9:11]), int(timestamp[12:14]), int(timestamp[15:17])
+    )
 
-    def _clean_player_name(self, name: str) -> str:
-        """Clean player name by removing markers and extra whitespace."""
-        self.logger.info(f"TRACE: _clean_player_name input: '{name}'")
-        
-        # Remove leading/trailing whitespace first
-        name = name.strip()
-        
-        # Remove markers while preserving names that start with those letters
-        if name.startswith('> '):
-            self.logger.info("TRACE: Removing '> ' marker")
-            name = name[2:]
-        if name.startswith('D '):
-            self.logger.info("TRACE: Removing 'D ' marker")
-            name = name[2:]
-        if name.startswith('V '):
-            self.logger.info("TRACE: Removing 'V ' marker")
-            name = name[2:]
-            
-        # Final trim of any remaining whitespace
-        name = name.strip()
-        
-        self.logger.info(f"TRACE: _clean_player_name output: '{name}'")
-        return name
+@lru_cache(maxsize=2048)
+def clean_player_name(name: str) -> str:
+    """Clean player name by removing markers and extra whitespace.
+    Preserves the actual name even when prefixed with status markers.
 
+    Names recur throughout a hand (and across hands), so results are cached.
+    """
+    return _MARKER_RE.sub('', name.strip(), count=1).strip()
+
+class HandParser:
     def _parse_header(self, text: str) -> Dict:
         """Parse the header of the hand history."""
-        header_match = re.search(r'Subject: \[([^]]+)\]\[hand:(\d+)\]', text)
+        header_match = _HEADER_RE.search(text)
         if not header_match:
             raise ValueError("Cannot parse hand header")
         
         table_id, hand_number = header_match.groups()
-        day_match = re.search(r'! Table [^,]+, Hand \d+, Day (\d+)', text)
+        day_match = _DAY_RE.search(text)
         day = day_match.group(1) if day_match else None
         
         return {
@@ -81,13 +116,10 @@ class HandParser:
             return []
             
         player_table = text[table_start:table_end]
-        
-        # Updated pattern to handle D, >, V or space markers
-        player_pattern = r'\s*(\d+)\|([DV>\s])\s*([^|]+?)\s*\|\s*(\d+,?\d*)\s*\|\s*(\d*,?\d*)\s*\|\s*([^|]*?)\s*\|'
-        
-        for match in re.finditer(player_pattern, player_table):
+
+        for match in _PLAYER_RE.finditer(player_table):
             seat, marker, name, bankroll, action, status = match.groups()
-            name = self._clean_player_name(name)
+            name = clean_player_name(name)
             if name and not name.startswith('Name'):  
                 is_on_vacation = (
                     marker.strip() == 'V' or 
@@ -110,13 +142,12 @@ class HandParser:
     def _extract_action_amount(self, action_text: str, prev_bet_amount: Optional[int] = None) -> Optional[int]:
         """Extract the amount from action text, handling various formats."""
         if 'raises' in action_text:
-            raise_pattern = r'raises \$(\d+,?\d*) to \$(\d+,?\d*) total'
-            raise_match = re.search(raise_pattern, action_text)
+            raise_match = _RAISE_RE.search(action_text)
             if raise_match:
                 raise_size = int(raise_match.group(1).replace(',', ''))
                 return raise_size
             
-            total_match = re.search(r'to \$(\d+,?\d*) total', action_text)
+            total_match = _TOTAL_RE.search(action_text)
             if total_match and prev_bet_amount is not None:
                 total_amount = int(total_match.group(1).replace(',', ''))
                 return total_amount - prev_bet_amount
@@ -124,11 +155,11 @@ class HandParser:
         if 'calls' in action_text:
             if prev_bet_amount:
                 return prev_bet_amount
-            amount_match = re.search(r'\$(\d+,?\d*)', action_text)
+            amount_match = _AMOUNT_RE.search(action_text)
             if amount_match:
                 return int(amount_match.group(1).replace(',', ''))
         
-        amount_match = re.search(r'\$(\d+,?\d*)', action_text)
+        amount_match = _AMOUNT_RE.search(action_text)
         if amount_match:
             return int(amount_match.group(1).replace(',', ''))
         
@@ -146,131 +177,82 @@ class HandParser:
 
         current_street = Street.PREFLOP
         prev_bet_amount = 0
+        blinds = []
+        dealing_timestamp = None
 
-        action_pattern = r'! (\d{2}/\d{2}/\d{2} \d{2}:\d{2}:\d{2})! (.*?)(?=!|\n)'
-        blind_pattern = r'! [^!]+! ([^!]+) blinds \$(\d+,?\d*)'
-
-        # Parse blind actions first
-        for match in re.finditer(blind_pattern, history_text):
-            player, amount = match.groups()
-            amount = int(amount.replace(',', ''))
-            dealing_match = re.search(r'! (\d{2}/\d{2}/\d{2} \d{2}:\d{2}:\d{2})! Dealing', history_text)
-            if dealing_match:
-                timestamp = datetime.strptime(dealing_match.group(1), '%m/%d/%y %H:%M:%S')
-                player = self._clean_player_name(player)
-                actions.append(HandAction(
-                    timestamp=timestamp,
-                    player=player,
-                    action_type='blind',
-                    amount=amount,
-                    street=Street.PREFLOP
-                ))
-                prev_bet_amount = amount
+        # One scan picks up blinds, the deal, street changes and player actions;
+        # the group that matched (lastgroup) names the action type
+        for match in _ACTION_RE.finditer(history_text):
+            timestamp_str, action_text = match.group('ts', 'text')
+            action_type = match.lastgroup
+
+            # Blinds are posted before the deal; they take effect once it is seen
+            if action_type == 'blind':
+                amount = int(match.group('blind_amount').replace(',', ''))
+                blinds.append((clean_player_name(match.group('player')), amount))
+                if dealing_timestamp is not None:
+                    prev_bet_amount = amount
+                continue
+            elif action_type == 'dealing':
+                if dealing_timestamp is None:
+                    dealing_timestamp = timestamp_str
+                    if blinds:
+                        prev_bet_amount = blinds[-1][1]
+                continue
 
-        # Parse other actions
-        for match in re.finditer(action_pattern, history_text):
-            timestamp_str, action_text = match.groups()
-            
             # Skip table talk/chat messages and underscores
             if '"' in action_text or '--' in action_text or '_' in action_text:
                 continue
 
             try:
-                timestamp = datetime.strptime(timestamp_str, '%m/%d/%y %H:%M:%S')
-                action = None
+                timestamp = _parse_timestamp(timestamp_str)
 
                 # Update current street
-                if 'Flopped cards:' in action_text:
+                if action_type == 'flop':
                     current_street = Street.FLOP
                     prev_bet_amount = 0
                     continue
-                elif 'Flopped card:' in action_text and current_street == Street.FLOP:
-                    current_street = Street.TURN
-                    prev_bet_amount = 0
-                    continue
-                elif 'Flopped card:' in action_text and current_street == Street.TURN:
-                    current_street = Street.RIVER
-                    prev_bet_amount = 0
+                elif action_type == 'card':
+                    next_street = _NEXT_STREET.get(current_street)
+                    if next_street is not None:
+                        current_street = next_street
+                        prev_bet_amount = 0
                     continue
 
-                # Skip other non-action lines
-                if any(skip in action_text for skip in ['Dealing', 'Pot right']):
-                    continue
-                
                 # Parse player actions
-                player_name = ''
-                if 'is back from vacation' in action_text.lower():
-                    continue
-                elif 'is on vacation and folds' in action_text.lower():
-                    player_name = action_text.split('is on vacation and folds')[0].strip()
-                    action = HandAction(
-                        timestamp=timestamp,
-                        player=self._clean_player_name(player_name),
-                        action_type='vacation_fold',
-                        street=current_street
-                    )
-                elif 'folds' in action_text:
-                    player_name = action_text.split(' folds')[0].strip()
-                    action = HandAction(
-                        timestamp=timestamp,
-                        player=self._clean_player_name(player_name),
-                        action_type='fold',
-                        street=current_street
-                    )
-                elif 'calls' in action_text:
-                    player_name = action_text.split(' calls')[0].strip()
-                    amount = self._extract_action_amount(action_text, prev_bet_amount)
-                    action = HandAction(
-                        timestamp=timestamp,
-                        player=self._clean_player_name(player_name),
-                        action_type='call',
-                        amount=amount,
-                        is_all_in='all in' in action_text.lower(),
-                        street=current_street
-                    )
-                elif 'raises' in action_text:
-                    player_name = action_text.split(' raises')[0].strip()
+                amount = None
+                if action_type in ('call', 'raise'):
                     amount = self._extract_action_amount(action_text, prev_bet_amount)
-                    action = HandAction(
-                        timestamp=timestamp,
-                        player=self._clean_player_name(player_name),
-                        action_type='raise',
-                        amount=amount,
-                        is_all_in='all in' in action_text.lower(),
-                        street=current_street
-                    )
-                    if amount:
-                        prev_bet_amount = amount
-                elif 'checks' in action_text:
-                    player_name = action_text.split(' checks')[0].strip()
-                    action = HandAction(
-                        timestamp=timestamp,
-                        player=self._clean_player_name(player_name),
-                        action_type='check',
-                        street=current_street
-                    )
-                elif 'bets' in action_text:
-                    player_name = action_text.split(' bets')[0].strip()
+                elif action_type == 'bet':
                     amount = self._extract_action_amount(action_text)
-                    action = HandAction(
-                        timestamp=timestamp,
-                        player=self._clean_player_name(player_name),
-                        action_type='bet',
-                        amount=amount,
-                        is_all_in='all in' in action_text.lower(),
-                        street=current_street
-                    )
-                    if amount:
-                        prev_bet_amount = amount
-
-                if action:
-                    actions.append(action)
+
+                actions.append(HandAction(
+                    timestamp=timestamp,
+                    player=clean_player_name(match.group('player')),
+                    action_type=action_type,
+                    amount=amount,
+                    is_all_in=action_type in ('call', 'raise', 'bet') and 'all in' in action_text.lower(),
+                    street=current_street
+                ))
+                if amount and action_type in ('raise', 'bet'):
+                    prev_bet_amount = amount
 
             except Exception as e:
-                self.logger.warning(f"Skipping malformed action line: {action_text}. Error: {e}")
+                logger.warning("Skipping malformed action line: %s. Error: %s", action_text, e)
                 continue
 
-        return actions
+        # Blinds are stamped with the deal time and listed before all other
+        # actions; without a deal there are no blinds to record
+        if dealing_timestamp is None or not blinds:
+            return actions
+        timestamp = _parse_timestamp(dealing_timestamp)
+        return [HandAction(
+            timestamp=timestamp,
+            player=player,
+            action_type='blind',
+            amount=amount,
+            street=Street.PREFLOP
+        ) for player, amount in blinds] + actions
 
     def parse_hand(self, hand_text: str) -> Dict:
         """Parse a complete hand history text and return structured data."""
@@ -282,42 +264,42 @@ class HandParser:
             # Extract actions
             actions = self._parse_actions(hand_text)
 
-            # Extract the final board
-            final_board_pattern = r'! Hand over, current board is:  ([^\n]+)'
-            final_board_match = re.search(final_board_pattern, hand_text)
-            final_board = final_board_match.group(1).strip() if final_board_match else None
-
-            # Extract shown cards
+            # One scan finds the final board, shown cards, winner and uncalled
+            # bet; as with separate searches, the first board/winner/uncalled
+            # line counts and every shown-cards line is collected
+            final_board_match = winner_match = uncalled_match = None
             shown_cards = {}
-            cards_pattern = r'! ([^!]+?)\s+has:\s+([^\n]+)'
-            for match in re.finditer(cards_pattern, hand_text):
-                player_name = self._clean_player_name(match.group(1))
-                cards = match.group(2).strip()
-                shown_cards[player_name] = cards
+            for match in _TAIL_RE.finditer(hand_text):
+                kind = match.lastgroup
+                if kind == 'cards':
+                    player_name = clean_player_name(match.group('shown_player'))
+                    shown_cards[player_name] = match.group('cards').strip()
+                elif kind == 'board' and final_board_match is None:
+                    final_board_match = match
+                elif kind == 'pot' and winner_match is None:
+                    winner_match = match
+                elif kind == 'uncalled_player' and uncalled_match is None:
+                    uncalled_match = match
+
+            final_board = final_board_match.group('board').strip() if final_board_match else None
 
             # Update each player's shown cards in the results
+            players_by_name = {player['name']: player for player in players}
             for player_name, cards in shown_cards.items():
-                for i, player in enumerate(players):
-                    if player['name'] == player_name:
-                        players[i]['cards_shown'] = cards
+                player = players_by_name.get(player_name)
+                if player:
+                    player['cards_shown'] = cards
 
             # Extract winner and total pot
-            winner_pattern = r'! ([^!]+?) wins \$(\d+,?\d*)'
-            winner_match = re.search(winner_pattern, hand_text)
             winner = None
             total_pot = 0
             if winner_match:
-                winner = self._clean_player_name(winner_match.group(1))
-                total_pot = int(winner_match.group(2).replace(',', ''))
+                winner = clean_player_name(winner_match.group('winner'))
+                total_pot = int(winner_match.group('pot').replace(',', ''))
 
-             # Extract uncalled amount - ADD THIS SECTION HERE
-            uncalled_pattern = r'! Uncalled bet \(\$(\d+,?\d*)\) returned to ([^!]+)'
-            uncalled_match = re.search(uncalled_pattern, hand_text)
             uncalled_amount = 0
             if uncalled_match:
-                uncalled_amount = int(uncalled_match.group(1).replace(',', ''))
-                uncalled_player = self._clean_player_name(uncalled_match.group(2))
-    
+                uncalled_amount = int(uncalled_match.group('uncalled').replace(',', ''))
 
             # Add metadata about the hand
             result = {
@@ -331,9 +313,9 @@ class HandParser:
                 'uncalled_amount': uncalled_amount
             }
 
-            self.logger.info(f"Successfully parsed hand {hand_info['hand_number']}")
+            logger.debug("Successfully parsed hand %s", hand_info['hand_number'])
             return result
 
         except Exception as e:
-            self.logger.error(f"Error parsing hand: {e}")
+            logger.error("Error parsing hand: %s", e)
             raise
\ No newline at end of file
@@ -0,0 +1,83 @@
+from html.parser import HTMLParser
+from typing import List, Optional
+
+class _TableRowParser(HTMLParser):
+    """Collect the text of the <td> cells of every <tr> in a single pass."""
+
+    def __init__(self, first_table_only: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.first_table_only = first_table_only
+        self.rows: List[List[str]] = []
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+        # Row and cell left open by each enclosing table, resumed when a
+        # nested table ends
+        self._outer: List[tuple] = []
+        self._done = False
+
+    def _close_cell(self):
+        if self._cell is not None:
+            self._row.append(''.join(self._cell))
+            self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        self._row = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._done:
+            return
+        if tag == 'table':
+            self._outer.append((self._row, self._cell))
+            self._row = self._cell = None
+        elif tag == 'tr':
+            # A new row implicitly closes an unclosed one
+            self._close_row()
+            if not self.first_table_only or self._outer:
+                self._row = []
+                self.rows.append(self._row)
+        elif tag in ('td', 'th') and self._row is not None:
+            self._close_cell()
+            # Header cells close the open cell but, like find_all('td'), are not collected
+            if tag == 'td':
+                self._cell = []
+
+    def handle_endtag(self, tag):
+        if self._done:
+            return
+        if tag in ('td', 'th'):
+            self._close_cell()
+        elif tag == 'tr':
+            self._close_row()
+        elif tag == 'table':
+            self._close_row()
+            if self._outer:
+                self._row, self._cell = self._outer.pop()
+                if self.first_table_only and not self._outer:
+                    self._done = True
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def close(self):
+        super().close()
+        # Keep cells left open at the end of a truncated page
+        self._close_row()
+        while self._outer:
+            self._row, self._cell = self._outer.pop()
+            self._close_row()
+
+def parse_table_rows(html: str, first_table_only: bool = False) -> List[List[str]]:
+    """
+    Extract table rows from an HTML page without building a document tree.
+
+    Returns one list per <tr> (including rows without <td> cells, such as
+    header rows) holding the text of each <td> cell, surrounding whitespace
+    stripped. With first_table_only, only rows of the page's first table are
+    returned.
+    """
+    parser = _TableRowParser(first_table_only)
+    parser.feed(html)
+    parser.close()
+    return [[cell.strip() for cell in row] for row in parser.rows]
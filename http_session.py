@@ -0,0 +1,95 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Validators and bodies of scraped pages, kept between runs for conditional GETs
+_CACHE_DIR = Path.home() / ".cache" / "wrgpt"
+
+def create_session(pool_connections: int = 4, pool_maxsize: int = 16, max_retries: int = 3) -> requests.Session:
+    """Create a requests session that keeps connections alive and retries transient errors.
+
+    Retries happen inside urllib3, out of sight of any RateLimiter; callers
+    that rate limit should pass max_retries=0 and retry themselves.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=0.5,
+        status_forcelist=[502, 503, 504]
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry if max_retries else 0
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class RateLimiter:
+    """Token bucket shared by worker threads to cap the overall request rate."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def conditional_get(session: requests.Session, url: str, timeout: float = 10) -> str:
+    """Fetch a page's text, revalidating a cached copy with ETag/Last-Modified.
+
+    An unchanged page costs a 304 instead of a full download. Raises
+    requests.RequestException like a plain GET would.
+    """
+    cache_file = _CACHE_DIR / f"{hashlib.sha1(url.encode()).hexdigest()}.json"
+    try:
+        cached = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cached = None
+
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    response = session.get(url, timeout=timeout, headers=headers)
+    if response.status_code == 304 and cached:
+        return cached["body"]
+    response.raise_for_status()
+
+    text = response.text
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        try:
+            _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(json.dumps({
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "body": text
+            }), encoding="utf-8")
+        except OSError:
+            pass  # The cache is an optimisation only
+    return text
@@ -0,0 +1,65 @@
+import unittest
+
+from html_tables import parse_table_rows
+
+class ParseTableRowsTest(unittest.TestCase):
+    """parse_table_rows() stands in for BeautifulSoup's find_all('tr')/find_all('td')."""
+
+    def test_header_row_has_no_cells(self):
+        html = """
+            <table>
+              <tr><th>Player</th><th>Hands</th></tr>
+              <tr><td> Alice </td><td>12</td></tr>
+            </table>
+        """
+        self.assertEqual(parse_table_rows(html), [[], ['Alice', '12']])
+
+    def test_cell_text_includes_inline_markup(self):
+        html = "<table><tr><td><b>Bold</b> text</td><td><a href='#'>link</a></td></tr></table>"
+        self.assertEqual(parse_table_rows(html), [['Bold text', 'link']])
+
+    def test_first_table_only(self):
+        html = """
+            <tr><td>before</td></tr>
+            <table><tr><td>a</td></tr></table>
+            <table><tr><td>b</td></tr></table>
+        """
+        self.assertEqual(parse_table_rows(html, first_table_only=True), [['a']])
+        self.assertEqual(parse_table_rows(html), [['before'], ['a'], ['b']])
+
+    def test_nested_table(self):
+        html = """
+            <table>
+              <tr><td>outer<table><tr><td>inner</td></tr></table></td><td>after</td></tr>
+              <tr><td>last</td></tr>
+            </table>
+            <table><tr><td>second</td></tr></table>
+        """
+        # The nested table's rows are listed separately and the outer row
+        # picks up again once it ends
+        self.assertEqual(
+            parse_table_rows(html),
+            [['outer', 'after'], ['inner'], ['last'], ['second']]
+        )
+        self.assertEqual(
+            parse_table_rows(html, first_table_only=True),
+            [['outer', 'after'], ['inner'], ['last']]
+        )
+
+    def test_unclosed_cells_and_rows(self):
+        html = "<table><tr><td>a<td>b<tr><td>c<th>head<td>d</table><p>outside</p>"
+        self.assertEqual(parse_table_rows(html), [['a', 'b'], ['c', 'd']])
+
+    def test_unclosed_table(self):
+        html = "<table><tr><td>a</td></tr><tr><td>b"
+        self.assertEqual(parse_table_rows(html, first_table_only=True), [['a'], ['b']])
+
+    def test_entities_and_charrefs(self):
+        html = (
+            "<table><tr><td>A &amp; B</td><td>&lt;x&gt;</td><td>&#36;1,000</td>"
+            "<td>&#x41;&nbsp;</td><td>caf&eacute;</td></tr></table>"
+        )
+        self.assertEqual(parse_table_rows(html), [['A & B', '<x>', '$1,000', 'A', 'café']])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+from db_manager import PokerDBManager
+from Stats import _STATS_QUERY, _SHOWDOWN_DETAILS_QUERY, _RFI_DETAILS_QUERY
+
+_ACTIONS_SCANS = (["SCAN", "a"], ["SCAN", "a2"], ["SCAN", "actions"])
+
+class StatsQueryPlanTest(unittest.TestCase):
+    """The stats queries must look up a single player's actions by index.
+
+    A full scan of actions is cheap on a small database but grows with every
+    hand collected, so it is checked against the query plan rather than timed.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmpdir.name, "plan.db")
+        db = PokerDBManager(cls.db_path)
+        db.connect()
+        db.initialize_database()
+
+        rng = random.Random(0)
+        players = [(f"Player {i}", "2025-01-01") for i in range(200)]
+        db.conn.executemany("INSERT INTO players (name, last_seen_date) VALUES (?, ?)", players)
+        hands, hand_players, actions = [], [], []
+        for n in range(2000):
+            hand_id = f"t01_{n}"
+            seated = rng.sample(range(1, len(players) + 1), 6)
+            hands.append((hand_id, "t01", "2025-01-01", 100, 200, 1, len(seated), None, 1000))
+            for seat, player_id in enumerate(seated, 1):
+                hand_players.append((hand_id, player_id, seat, 10000, 0, None))
+            for seq, player_id in enumerate(seated * 2, 1):
+                actions.append((hand_id, player_id, "preflop", rng.choice(["fold", "call", "raise"]), 200, 0, seq))
+        db.conn.executemany("INSERT INTO hands VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", hands)
+        db.conn.executemany("INSERT INTO hand_players VALUES (?, ?, ?, ?, ?, ?)", hand_players)
+        db.conn.executemany(
+            "INSERT INTO actions (hand_id, player_id, street, action_type, amount, is_all_in, sequence_number) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            actions
+        )
+        db.conn.commit()
+        db.conn.execute("ANALYZE")
+        db.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_single_player_searches_actions(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for query in (_STATS_QUERY, _SHOWDOWN_DETAILS_QUERY, _RFI_DETAILS_QUERY):
+                plan = [row[3] for row in conn.execute(
+                    "EXPLAIN QUERY PLAN " + query.format(players='= ?'), ("Player 1",)
+                )]
+                # Bare full scans print as just "SCAN a", so compare whole words
+                scans = [step for step in plan if step.split()[:2] in _ACTIONS_SCANS]
+                self.assertEqual(scans, [], "\n".join(plan))
+        finally:
+            conn.close()
+
+if __name__ == "__main__":
+    unittest.main()